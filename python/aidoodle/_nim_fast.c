@@ -0,0 +1,75 @@
+/* Fast random playouts for the nim engine.
+ *
+ * Mirrors the jitted rollout in games/nim.py: the board is one packed
+ * int with 4 bits per heap, moves are picked with an inline xorshift
+ * generator, and the function returns the index of the winning
+ * player. Built optionally; games/nim.py falls back to numba or plain
+ * python when the extension is missing.
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#define HEAP_BITS 4
+#define HEAP_MASK 0xF
+/* the python/numba rollout keeps the generator within 63 bits so it
+ * fits an int64; use the same mask so all backends return the same
+ * winner for the same (state, player_idx, seed) */
+#define SEED_MASK 0x7FFFFFFFFFFFFFFFULL
+
+static PyObject *
+rollout(PyObject *self, PyObject *args)
+{
+    unsigned long state;
+    int pidx;
+    unsigned long long seed;
+
+    if (!PyArg_ParseTuple(args, "kiK", &state, &pidx, &seed))
+        return NULL;
+
+    Py_BEGIN_ALLOW_THREADS
+    while (state != 0) {
+        unsigned long h0 = state & HEAP_MASK;
+        unsigned long h1 = (state >> HEAP_BITS) & HEAP_MASK;
+        unsigned long h2 = (state >> (2 * HEAP_BITS)) & HEAP_MASK;
+        unsigned long k;
+
+        seed ^= (seed << 13) & SEED_MASK;
+        seed ^= seed >> 7;
+        seed ^= (seed << 17) & SEED_MASK;
+        /* picking k uniformly from the total number of stones is
+         * equivalent to picking a legal (heap, amount) move */
+        k = (unsigned long)((seed >> 33) % (h0 + h1 + h2));
+
+        if (k < h0)
+            state -= k + 1;
+        else if (k < h0 + h1)
+            state -= (k - h0 + 1) << HEAP_BITS;
+        else
+            state -= (k - h0 - h1 + 1) << (2 * HEAP_BITS);
+
+        pidx = 1 - pidx;
+    }
+    Py_END_ALLOW_THREADS
+
+    return PyLong_FromLong(pidx);
+}
+
+static PyMethodDef NimFastMethods[] = {
+    {"rollout", rollout, METH_VARARGS,
+     "rollout(state, player_idx, seed) -> winner player index"},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef nimfastmodule = {
+    PyModuleDef_HEAD_INIT,
+    "_nim_fast",
+    "C implementation of the nim random playout.",
+    -1,
+    NimFastMethods
+};
+
+PyMODINIT_FUNC
+PyInit__nim_fast(void)
+{
+    return PyModule_Create(&nimfastmodule);
+}
@@ -2,10 +2,11 @@ from dataclasses import dataclass, field
 import math
 import random
 import sys
-from typing import Union
+from typing import Optional, Union
 
 from aidoodle.core import Engine, Game, Move, Player
 from aidoodle.ai.mcts import Cache, Node, choose_edge, search_iteration
+from aidoodle.rng import XorShift64
 
 
 CONCESSION_THRESHOLD = 0.4
@@ -25,9 +26,32 @@ class Agent:
 
 @dataclass(frozen=True)
 class RandomAgent(Agent):
+    # each agent owns its generator, so concurrent agents do not
+    # contend for the global random state
+    rng: XorShift64 = field(default_factory=XorShift64)
+
     def next_move(self, game: Game) -> Move:
         legal_moves = self.engine.get_legal_moves(game)
-        return random.choice(legal_moves)
+        return self.rng.choice(legal_moves)
+
+
+@dataclass(frozen=True)
+class PerfectNimAgent(Agent):
+    """Plays perfectly for engines that provide a perfect_move oracle
+
+    Mainly useful as a reference opponent and for validating that the
+    tree search converges to the known optimal strategy.
+    """
+    def next_move(self, game: Game) -> Move:
+        # not part of the generic engine protocol, fetched like the
+        # optional rollout hooks in mcts
+        perfect_move = getattr(self.engine, 'perfect_move')
+        move: Optional[Move] = perfect_move(game.board)
+        if move is not None:
+            return move
+
+        # lost position, no move is better than any other
+        return random.choice(self.engine.get_legal_moves(game))
 
 
 @dataclass(frozen=True)
@@ -39,7 +63,7 @@ class CliInputAgent(Agent):
 
         try:
             move: Move = self.engine.init_move(inp, game)
-        except (TypeError, NameError):
+        except (TypeError, NameError, ValueError, SyntaxError):
             sys.exit(1)
         return move
 
@@ -77,13 +101,15 @@ class MctsAgent(Agent):
     reuse_cache: bool = False
     cache: Cache = field(default_factory=dict)
     allow_concession: bool = False
+    n_leaf: int = 1
 
     def next_move(self, game: Game) -> Move:
         root = Node(game=game)
         cache: Cache = self.cache if self.reuse_cache else {}
 
         for _ in range(self.n_iter):
-            search_iteration(node=root, engine=self.engine, cache=cache)
+            search_iteration(
+                node=root, engine=self.engine, cache=cache, n_leaf=self.n_leaf)
 
         edge = choose_edge(root.edges)
         if not self.allow_concession:
@@ -100,4 +126,4 @@ class MctsAgent(Agent):
         return f"MctsAgent(n_iter={self.n_iter}, learning={self.reuse_cache})"
 
 
-Agents = Union[CliInputAgent, MctsAgent, RandomAgent]
+Agents = Union[CliInputAgent, MctsAgent, PerfectNimAgent, RandomAgent]
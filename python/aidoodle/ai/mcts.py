@@ -1,10 +1,12 @@
+from concurrent import futures
 from dataclasses import dataclass, field
 import enum
 import math
-import random
-from typing import List, Optional, Union, Iterable, TypeVar, Dict
+import threading
+from typing import List, Optional, Sequence, Union, Iterable, TypeVar, Dict
 
 from aidoodle.core import Engine, Game, Move, Player
+from aidoodle.rng import XorShift64
 
 
 C = math.sqrt(2)  # from literature
@@ -12,6 +14,20 @@ EPS = 1e-12  # for numerical stability
 VERBOSE = 0
 MAX_DEPTH = 10000
 
+# random picks during selection, expansion and fallback rollouts; one
+# generator per thread avoids the lock around the stdlib random state
+# without the threads of simulate_many sharing (and replaying) state
+_THREAD_LOCAL = threading.local()
+
+
+def _get_rng() -> XorShift64:
+    try:
+        rng: XorShift64 = _THREAD_LOCAL.rng
+    except AttributeError:
+        rng = XorShift64()
+        _THREAD_LOCAL.rng = rng
+    return rng
+
 Numeric = Union[float, int]
 T = TypeVar('T')
 
@@ -70,7 +86,7 @@ def select_ucb1(edges: _Edges, c: float = C) -> Edge:
 
 def select(edges: _Edges, strategy: Strategy = Strategy.ucb1) -> Edge:
     if strategy == Strategy.random:
-        return random.choice(edges)
+        return _get_rng().choice(edges)
     if strategy == Strategy.ucb1:
         return select_ucb1(edges)
     raise ValueError("Unknown strategy")
@@ -86,13 +102,19 @@ def choose_edge(edges: _Edges) -> Edge:
 def expand(node: Node, engine: Engine) -> None:
     # Careful: if a move is the identity move, there will be an
     # infinite recursion
-    moves: List[Move] = engine.get_legal_moves(node.game)
+    moves: Sequence[Move] = engine.get_legal_moves(node.game)
     edges = [Edge(move) for move in moves]
     assert not node.edges
     node.edges = edges
 
 
 def simulate(game: Game, engine: Engine) -> float:
+    # engines may provide a fast path that runs the whole random
+    # playout in compiled code (e.g. nim.rollout)
+    rollout = getattr(engine, 'rollout', None)
+    if rollout is not None:
+        return float(rollout(game))
+
     # init a game with random players
     game = engine.init_game(
         board=game.board,
@@ -105,7 +127,7 @@ def simulate(game: Game, engine: Engine) -> float:
 
     while not game.winner:
         # by default uses random play
-        move = random.choice(engine.get_legal_moves(game))
+        move = _get_rng().choice(engine.get_legal_moves(game))
         game = engine.make_move(game=game, move=move)
 
     if VERBOSE:
@@ -116,6 +138,40 @@ def simulate(game: Game, engine: Engine) -> float:
     return score
 
 
+# thread pool for leaf parallelization, created on first use and
+# shared between searches
+_EXECUTOR: Optional[futures.ThreadPoolExecutor] = None
+
+
+def _get_executor() -> futures.ThreadPoolExecutor:
+    global _EXECUTOR  # pylint: disable=global-statement
+    if _EXECUTOR is None:
+        _EXECUTOR = futures.ThreadPoolExecutor()
+    return _EXECUTOR
+
+
+def simulate_many(game: Game, engine: Engine, n_leaf: int) -> float:
+    """Leaf parallelization: run several rollouts from the same leaf
+
+    The average score of the rollouts is backpropagated once. This
+    only pays off when the rollouts release the GIL (e.g. the jitted
+    nim rollout); for pure python engines it is mostly equivalent to
+    n_leaf sequential rollouts.
+    """
+    if n_leaf == 1:
+        return simulate(game, engine=engine)
+
+    # engines may batch the rollouts themselves (e.g. the vectorized
+    # nim.rollout_many), which beats spreading them over threads
+    rollout_many = getattr(engine, 'rollout_many', None)
+    if rollout_many is not None:
+        return float(rollout_many(game, n_leaf))
+
+    executor = _get_executor()
+    tasks = [executor.submit(simulate, game, engine) for _ in range(n_leaf)]
+    return sum(task.result() for task in tasks) / n_leaf
+
+
 def _update_edge(edge: Edge, value: float) -> None:
     edge.s += 1
     edge.w += value
@@ -147,6 +203,7 @@ def search_iteration(
         engine: Engine,
         cache: Cache,
         strategy: Strategy = Strategy.ucb1,
+        n_leaf: int = 1,
 ) -> None:
     cache[node.game] = node
     edges: _Edges = []
@@ -169,7 +226,7 @@ def search_iteration(
 
     if node.edges:  # game end not reached
         # -> choose random move
-        edge = random.choice(node.edges)
+        edge = _get_rng().choice(node.edges)
         game = engine.make_move(game=node.game, move=edge.move)
         edges.append(edge)
         players.append(game.player)
@@ -177,7 +234,7 @@ def search_iteration(
         game = node.game
 
     # simulate
-    value = simulate(game, engine=engine)
+    value = simulate_many(game, engine=engine, n_leaf=n_leaf)
 
     # update
     update(edges, players=players, value=value)
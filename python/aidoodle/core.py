@@ -1,4 +1,4 @@
-from typing import List, Optional, Union
+from typing import Optional, Sequence, Union
 from typing_extensions import Protocol
 
 from aidoodle.games import battle
@@ -31,7 +31,7 @@ class Engine(Protocol):
         ...
 
     @staticmethod
-    def get_legal_moves(game: Game) -> List[Move]:
+    def get_legal_moves(game: Game) -> Sequence[Move]:
         ...
 
     @staticmethod
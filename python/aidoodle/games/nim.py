@@ -1,48 +1,70 @@
+from ast import literal_eval
 from dataclasses import dataclass
-from functools import total_ordering
 import random
-from typing import Any, List, Tuple, Optional, Generator, Set
+from typing import (
+    Any, Dict, Iterable, NamedTuple, Tuple, Optional, Generator, Set, Union)
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, fall back to pure python
+    njit = None  # type: ignore
+
+try:
+    from aidoodle import _nim_fast  # type: ignore
+except ImportError:  # the C extension was not built
+    _nim_fast = None
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional as well
+    np = None  # type: ignore
+
+from aidoodle.rng import XorShift64
 
 
 POSSIBLE_PLAYERS: Set[int] = {1, 2}
 POSSIBLE_HEAPS: Set[int] = {0, 1, 2}
+N_HEAPS = 3
 
+# the three heaps are packed into a single int, 4 bits per heap; this
+# keeps board hashing and copying cheap on the MCTS hot path
+_HEAP_BITS = 4
+_HEAP_MAX = (1 << _HEAP_BITS) - 1
+# specialized per heap, so the hot path indexes instead of multiplying
+_HEAP_SHIFTS = (0, _HEAP_BITS, 2 * _HEAP_BITS)
+_PACKED_MAX = (1 << (N_HEAPS * _HEAP_BITS)) - 1
 
-@dataclass(frozen=True)
-@total_ordering
-class Move:
+
+class Move(NamedTuple):
+    """A nim move; a named tuple, so equality, ordering, hashing and
+    iteration all use the C-level tuple fast paths"""
     i: int  # the heap
     j: int  # the amount
 
-    def __post_init__(self) -> None:
-        if self.i not in POSSIBLE_HEAPS:
-            raise ValueError("Impossible heap")
-        if self.j < 1:
-            raise ValueError("You have to take at least one stone")
-
     def __repr__(self) -> str:
         return f"Move({self.i}, {self.j})"
 
-    def __iter__(self) -> Generator[int, None, None]:
-        yield self.i
-        yield self.j
 
-    def __eq__(self, other: Any) -> bool:
-        try:
-            i: int
-            j: int
-            i, j = other
-            return (i == self.i) and (j == self.j)
-        except TypeError:
-            return False
+def _validate_move(move: Move) -> Move:
+    # only called at the input boundary; moves created internally are
+    # legal by construction
+    if move.i not in POSSIBLE_HEAPS:
+        raise ValueError("Impossible heap")
+    if move.j < 1:
+        raise ValueError("You have to take at least one stone")
+    return move
 
-    def __lt__(self, other: Any) -> bool:
-        if not isinstance(other, Move):
-            raise TypeError
-        return (self.i, self.j) < (other.i, other.j)
 
-    def __hash__(self) -> int:
-        return hash((self.i, self.j))
+_MOVES: Dict[Tuple[int, int], Move] = {}
+
+
+def _get_move(i: int, j: int) -> Move:
+    # intern moves so that repeated visits of the same position share
+    # the same objects instead of constructing new ones
+    try:
+        return _MOVES[(i, j)]
+    except KeyError:
+        return _MOVES.setdefault((i, j), Move(i, j))
 
 
 @dataclass(frozen=True)
@@ -74,10 +96,70 @@ class Player:
 
 MaybePlayer = Optional[Player]
 
+# the only two players there are; interning them avoids construction
+# and validation cost on the search hot path
+PLAYER_1 = Player(1)
+PLAYER_2 = Player(2)
+_PLAYERS = {1: PLAYER_1, 2: PLAYER_2}
+
+
+def _pack_state(state: Iterable[int]) -> int:
+    packed = 0
+    for i, n in enumerate(state):
+        if not 0 <= n <= _HEAP_MAX:
+            raise ValueError(f"Heap size must be between 0 and {_HEAP_MAX}")
+        packed |= n << (_HEAP_BITS * i)
+    return packed
+
+
+def _unpack_state(packed: int) -> Tuple[int, int, int]:
+    return (
+        packed & _HEAP_MAX,
+        (packed >> _HEAP_BITS) & _HEAP_MAX,
+        (packed >> (2 * _HEAP_BITS)) & _HEAP_MAX)
+
+
+# zobrist keys, one 64 bit value per (heap, count) combination; seeded
+# so that hashes are reproducible across processes
+_zobrist_rng = random.Random("aidoodle-nim-zobrist")
+ZOBRIST: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(_zobrist_rng.getrandbits(64) for _ in range(_HEAP_MAX + 1))
+    for _ in range(N_HEAPS))
+
+
+def zobrist_hash(packed: int) -> int:
+    return (
+        ZOBRIST[0][packed & _HEAP_MAX]
+        ^ ZOBRIST[1][(packed >> _HEAP_BITS) & _HEAP_MAX]
+        ^ ZOBRIST[2][(packed >> (2 * _HEAP_BITS)) & _HEAP_MAX])
+
 
-@dataclass(frozen=True)
 class Board:
-    state: Tuple[int, int, int] = (3, 4, 5)
+    """Nim board, stored as a single packed int
+
+    Heap counts are accessible through the ``state`` attribute as
+    before, but internally the board is just one int, which makes
+    hashing, equality and copies cheap for the tree search.
+    """
+    __slots__ = ('packed', '_hash')
+
+    def __init__(self, state: Union[Tuple[int, int, int], int] = (3, 4, 5)):
+        if isinstance(state, int):
+            # bits beyond the heap nibbles would make a board that is
+            # not empty yet has no stones to take, breaking the rollouts
+            if not 0 <= state <= _PACKED_MAX:
+                raise ValueError(
+                    f"Packed state must fit {N_HEAPS} heaps "
+                    f"of {_HEAP_BITS} bits")
+            self.packed = state
+        else:
+            self.packed = _pack_state(state)
+        # computed once, used on every node lookup of the tree search
+        self._hash = zobrist_hash(self.packed)
+
+    @property
+    def state(self) -> Tuple[int, int, int]:
+        return _unpack_state(self.packed)
 
     def __repr__(self) -> str:
         header = "\n|" + "|".join(map(str, range(len(self)))) + "|\n"
@@ -85,6 +167,8 @@ class Board:
         return header + "|" + "|".join(map(str, self.state)) + "|\n"
 
     def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Board):
+            return self.packed == other.packed
         try:
             res: bool = self.state == other.state
             return res
@@ -95,10 +179,10 @@ class Board:
         yield from self.state
 
     def __len__(self) -> int:
-        return len(self.state)
+        return N_HEAPS
 
     def __hash__(self) -> int:
-        return hash(self.state)
+        return self._hash
 
 
 MaybeBoard = Optional[Board]
@@ -116,10 +200,9 @@ class Game:
     players: Tuple[Player, Player]
     board: Board
     player_idx: int = 0
-
-    @property
-    def winner(self) -> MaybePlayer:
-        return determine_winner(self)
+    # determined once when the game state is created, so that the many
+    # winner checks per tree-search visit are attribute lookups
+    winner: MaybePlayer = None
 
     @property
     def player(self) -> Player:
@@ -127,9 +210,7 @@ class Game:
 
 
 def determine_winner(game: Game) -> MaybePlayer:
-    board = game.board
-
-    if sum(board) != 0:  # not yet empty
+    if game.board.packed != 0:  # not yet empty
         return None
 
     # last player to have taken a stone loses
@@ -137,23 +218,89 @@ def determine_winner(game: Game) -> MaybePlayer:
 
 
 def get_next_player_idx(game: Game) -> int:
-    return int(game.player == Player(1))
+    # the two players strictly alternate
+    return game.player_idx ^ 1
 
 
-def _get_all_moves(board: Board) -> Generator[Move, None, None]:
-    for i, n in enumerate(board):
-        if n == 0:
-            continue
-
+def _get_all_moves(board: Board) -> Tuple[Move, ...]:
+    # only runs on a legal-move cache miss, so a plain loop beats
+    # paying the generator frame bounce per move
+    packed = board.packed
+    moves = []
+    for i in range(N_HEAPS):
+        n = (packed >> _HEAP_SHIFTS[i]) & _HEAP_MAX
         for j in range(1, n + 1):
-            yield Move(i, j)
+            moves.append(_get_move(i, j))
+    return tuple(moves)
+
+
+# legal moves per packed board state; the state space is tiny, so the
+# moves for each position are computed once and shared afterwards
+_LEGAL_CACHE: Dict[int, Tuple[Move, ...]] = {}
 
 
-def get_legal_moves(game: Game) -> List[Move]:
+def get_legal_moves(game: Game) -> Tuple[Move, ...]:
     if game.winner:
-        return []
+        return ()
+
+    packed = game.board.packed
+    try:
+        return _LEGAL_CACHE[packed]
+    except KeyError:
+        return _LEGAL_CACHE.setdefault(packed, _get_all_moves(game.board))
+
+
+MaybeMove = Optional[Move]
+
+
+def perfect_move(board: Board) -> MaybeMove:
+    """Return a winning move for the player to move, if one exists
+
+    Based on the Sprague-Grundy theory of nim. Note that this game is
+    misere nim (whoever takes the last stone loses), so the usual
+    "leave an XOR of zero" rule applies only while at least two heaps
+    have more than one stone; the endgame instead aims at leaving an
+    odd number of single-stone heaps.
+    """
+    state = board.state
+    n_big = sum(n > 1 for n in state)
 
-    return list(_get_all_moves(game.board))
+    if n_big == 0:
+        # only single-stone heaps left; winning iff their number is even
+        ones = [i for i, n in enumerate(state) if n == 1]
+        if ones and len(ones) % 2 == 0:
+            return _get_move(ones[0], 1)
+        return None
+
+    if n_big == 1:
+        # endgame: shrink the big heap so that an odd number of
+        # single-stone heaps remains for the opponent
+        i = next(i for i, n in enumerate(state) if n > 1)
+        n_ones = sum(n == 1 for n in state)
+        target = 1 if n_ones % 2 == 0 else 0
+        return _get_move(i, state[i] - target)
+
+    x = state[0] ^ state[1] ^ state[2]
+    if x == 0:  # losing position, no winning move exists
+        return None
+
+    for i, n in enumerate(state):
+        target = n ^ x
+        if target < n:
+            return _get_move(i, n - target)
+    return None
+
+
+def _apply_move_packed(packed: int, i_heap: int, n_stones: int) -> int:
+    # the int-only core of apply_move; hot loops work on packed ints
+    # and plain move ints directly, Move objects only exist at the
+    # boundary to the generic engine interface
+    shift = _HEAP_SHIFTS[i_heap]
+
+    if ((packed >> shift) & _HEAP_MAX) < n_stones:
+        raise ValueError('illegal move')
+
+    return packed - (n_stones << shift)
 
 
 def apply_move(
@@ -161,18 +308,8 @@ def apply_move(
         move: Move,
         player: Player = Player(1),  # pylint: disable=unused-argument
 ) -> Board:
-    state = board.state
     i_heap, n_stones = move
-
-    if state[i_heap] < n_stones:
-        raise ValueError('illegal move')
-
-    state_new = (
-        state[0] - n_stones if i_heap == 0 else state[0],
-        state[1] - n_stones if i_heap == 1 else state[1],
-        state[2] - n_stones if i_heap == 2 else state[2])
-
-    return Board(state=state_new)
+    return Board(_apply_move_packed(board.packed, i_heap, n_stones))
 
 
 def init_move(
@@ -181,31 +318,37 @@ def init_move(
 ) -> Move:
     i: int
     j: int
-    i, j = eval(s)
-    return Move(i, j)
+    i, j = literal_eval(s)
+    return _validate_move(Move(i, j))
 
 
 def init_player(i: int) -> Player:
-    return Player(i)
+    player = _PLAYERS.get(i)
+    if player is None:  # let Player raise on illegal input
+        return Player(i)
+    return player
 
 
 def make_move(game: Game, move: Move) -> Game:
     board = apply_move(board=game.board, move=move, player=game.player)
-    player_idx = get_next_player_idx(game)
+    player_idx = game.player_idx ^ 1  # inlined get_next_player_idx
     return Game(
         players=game.players,
         board=board,
         player_idx=player_idx,
+        winner=game.players[player_idx] if board.packed == 0 else None,
     )
 
 
-def winner_to_score(winner: Player) -> float:
-    if winner == 1:
-        return 1.0
-    if winner == 2:
-        return 0.0
+# scores from the perspective of player 1; nim cannot tie
+_SCORES = {1: 1.0, 2: 0.0}
+
 
-    raise ValueError("Illegal player")
+def winner_to_score(winner: Player) -> float:
+    try:
+        return _SCORES[winner.i]
+    except (KeyError, AttributeError):
+        raise ValueError("Illegal player") from None
 
 
 def game_score(game: Game) -> float:
@@ -215,10 +358,107 @@ def game_score(game: Game) -> float:
     return winner_to_score(game.winner)
 
 
+# xorshift state is kept to 63 bits so that the same code compiles to
+# plain int64 arithmetic under numba and runs unchanged without it
+_SEED_MASK = (1 << 63) - 1
+
+
+def _rollout_plain(packed: int, player_idx: int, seed: int) -> int:
+    while packed:
+        h0 = packed & _HEAP_MAX
+        h1 = (packed >> _HEAP_BITS) & _HEAP_MAX
+        h2 = (packed >> (2 * _HEAP_BITS)) & _HEAP_MAX
+
+        # xorshift; picking k uniformly from the total number of
+        # stones is equivalent to picking a legal (heap, amount) move
+        seed ^= (seed << 13) & _SEED_MASK
+        seed ^= seed >> 7
+        seed ^= (seed << 17) & _SEED_MASK
+        k = (seed >> 33) % (h0 + h1 + h2)
+
+        if k < h0:
+            packed -= k + 1
+        elif k < h0 + h1:
+            packed -= (k - h0 + 1) << _HEAP_BITS
+        else:
+            packed -= (k - h0 - h1 + 1) << (2 * _HEAP_BITS)
+
+        player_idx = 1 - player_idx
+
+    return player_idx
+
+
+# fastest available implementation wins: C extension, then numba,
+# then plain python
+if _nim_fast is not None:
+    _rollout = _nim_fast.rollout
+elif njit is not None:
+    _rollout = njit(cache=True, nogil=True)(_rollout_plain)
+else:
+    _rollout = _rollout_plain
+
+# only draws the starting seeds of the rollouts, which keeps the
+# locking random module off the hot path
+_seed_rng = XorShift64()
+
+
+def rollout(game: Game) -> float:
+    """Play one random playout from the given position
+
+    Returns the same score that the generic simulation in mcts would
+    produce, but runs the whole playout as a compiled integer loop.
+    """
+    winner_idx = _rollout(game.board.packed, game.player_idx, _seed_rng.next_int())
+    return winner_to_score(game.players[winner_idx])
+
+
+def rollout_many(game: Game, n: int) -> float:
+    """Average score of n random playouts from the given position
+
+    The playouts are stepped in lockstep on numpy arrays, so one
+    python-level iteration advances all of them at once. Falls back to
+    n sequential rollouts when numpy is not installed.
+    """
+    if np is None:
+        return sum(rollout(game) for _ in range(n)) / n
+
+    states = np.full(n, game.board.packed, dtype=np.uint32)
+    players = np.full(n, game.player_idx, dtype=np.int8)
+    rng = np.random.default_rng(_seed_rng.next_int())
+
+    alive = states != 0
+    while alive.any():
+        s = states[alive]
+        h0 = s & _HEAP_MAX
+        h1 = (s >> _HEAP_BITS) & _HEAP_MAX
+        h2 = (s >> (2 * _HEAP_BITS)) & _HEAP_MAX
+
+        # as in _rollout_plain, a uniform pick from the total stone
+        # count maps to a uniform pick of a legal (heap, amount) move
+        k = rng.integers(0, h0 + h1 + h2)
+        in_heap0 = k < h0
+        in_heap1 = ~in_heap0 & (k < h0 + h1)
+        take = np.where(
+            in_heap0, k + 1,
+            np.where(
+                in_heap1, (k - h0 + 1) << _HEAP_BITS,
+                (k - h0 - h1 + 1) << (2 * _HEAP_BITS)))
+
+        states[alive] = s - take
+        players[alive] ^= 1
+        alive = states != 0
+
+    # whoever is to move on an empty board has won
+    idx_player1 = 0 if game.players[0].i == 1 else 1
+    return float((players == idx_player1).mean())
+
+
 def init_game(board: MaybeBoard = None, player_idx: int = 0) -> Game:
     board_: Board = board if board is not None else make_random_board()
+    players = (PLAYER_1, PLAYER_2)
     return Game(
-        players=(Player(1), Player(2)),
+        players=players,
         board=board_,
         player_idx=player_idx,
+        winner=players[player_idx] if board_.packed == 0 else None,
     )
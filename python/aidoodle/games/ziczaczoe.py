@@ -1,5 +1,5 @@
+from ast import literal_eval
 from dataclasses import dataclass
-from functools import total_ordering
 from itertools import product
 import random
 from typing import Any, List, Tuple, Optional, Generator, Set
@@ -10,7 +10,6 @@ POSSIBLE_MOVES: Set[Tuple[int, int]] = set(product(range(5), range(5)))
 
 
 @dataclass(frozen=True)
-@total_ordering
 class Move:
     i: int
     j: int
@@ -35,11 +34,28 @@ class Move:
         except TypeError:
             return False
 
+    # written out instead of synthesized by total_ordering, which
+    # wraps each comparison in two extra python-level dispatches
     def __lt__(self, other: Any) -> bool:
         if not isinstance(other, Move):
             raise TypeError
         return (self.i, self.j) < (other.i, other.j)
 
+    def __le__(self, other: Any) -> bool:
+        if not isinstance(other, Move):
+            raise TypeError
+        return (self.i, self.j) <= (other.i, other.j)
+
+    def __gt__(self, other: Any) -> bool:
+        if not isinstance(other, Move):
+            raise TypeError
+        return (self.i, self.j) > (other.i, other.j)
+
+    def __ge__(self, other: Any) -> bool:
+        if not isinstance(other, Move):
+            raise TypeError
+        return (self.i, self.j) >= (other.i, other.j)
+
     def __hash__(self) -> int:
         return hash((self.i, self.j))
 
@@ -109,7 +125,6 @@ STATES: List[_State] = [
 ]
 
 @dataclass(frozen=True)
-@total_ordering
 class Board:
     state: _State = (
         (0, 0, 0, 0, 0),
@@ -151,6 +166,21 @@ class Board:
             raise TypeError
         return self.state < other.state
 
+    def __le__(self, other: Any) -> bool:
+        if not isinstance(other, Board):
+            raise TypeError
+        return self.state <= other.state
+
+    def __gt__(self, other: Any) -> bool:
+        if not isinstance(other, Board):
+            raise TypeError
+        return self.state > other.state
+
+    def __ge__(self, other: Any) -> bool:
+        if not isinstance(other, Board):
+            raise TypeError
+        return self.state >= other.state
+
     def __hash__(self) -> int:
         return hash(self.state)
 
@@ -296,7 +326,7 @@ def init_move(
 ) -> Move:
     i: int
     j: int
-    i, j = eval(s)
+    i, j = literal_eval(s)
     return Move(i, j)
 
 
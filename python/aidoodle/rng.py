@@ -0,0 +1,44 @@
+import random
+from typing import Optional, Sequence, TypeVar
+
+
+T = TypeVar('T')
+
+# 63 bits so that the same arithmetic stays within int64 range when
+# the generator is inlined in compiled code (see games.nim)
+_MASK = (1 << 63) - 1
+
+
+class XorShift64:
+    """Small lock-free xorshift generator
+
+    The stdlib random module guards one global Mersenne Twister behind
+    a lock, which serializes concurrent rollouts and costs a dispatch
+    per draw. Random play does not need that quality, so agents and
+    hot loops use one of these per owner instead.
+    """
+
+    __slots__ = ('state',)
+
+    def __init__(self, seed: Optional[int] = None):
+        self.reseed(seed)
+
+    def reseed(self, seed: Optional[int] = None) -> None:
+        """Reset the generator state, e.g. after forking a worker"""
+        if seed is None:
+            # os.urandom-backed, so forked processes diverge even when
+            # they inherit identical generator state
+            seed = random.SystemRandom().getrandbits(62)
+        self.state = (seed | 1) & _MASK
+
+    def next_int(self) -> int:
+        s = self.state
+        s ^= (s << 13) & _MASK
+        s ^= s >> 7
+        s ^= (s << 17) & _MASK
+        self.state = s
+        return s
+
+    def choice(self, seq: Sequence[T]) -> T:
+        # the high bits have the better statistics
+        return seq[(self.next_int() >> 33) % len(seq)]
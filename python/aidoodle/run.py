@@ -1,3 +1,4 @@
+from concurrent import futures
 from dataclasses import replace
 import gc
 import json
@@ -7,8 +8,14 @@ from typing import Any, Optional, Tuple, Dict, List, Set
 
 import click
 
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None  # type: ignore
+
 from aidoodle.agents import Agents, MctsAgent, RandomAgent, CliInputAgent
 from aidoodle.agents import Concession
+from aidoodle.ai import mcts
 from aidoodle.core import Board
 from aidoodle.core import Engine
 from aidoodle.core import Player
@@ -39,7 +46,33 @@ def play_game(
         silent: bool = False,
         n_runs: Optional[int] = None,
         pause: float = 0.0,
+        n_jobs: int = 1,
 ) -> Tuple[int, int, int, int]:
+    if n_runs is not None and n_jobs != 1:
+        return _play_games_parallel(
+            agent1=agent1,
+            agent2=agent2,
+            engine=engine,
+            board=board,
+            n_runs=n_runs,
+            n_jobs=n_jobs,
+        )
+
+    if n_runs is not None:  # simulation, tally once at the end
+        results = [
+            int(_play_game(
+                agent1=agent1,
+                agent2=agent2,
+                engine=engine,
+                board=board,
+                silent=silent,
+                pause=pause,
+            ))
+            for _ in range(n_runs)
+        ]
+        return _tally(results)
+
+    # interactive play
     n_games = 0
     n_wins1 = 0
     n_wins2 = 0
@@ -55,8 +88,7 @@ def play_game(
             silent=silent,
             pause=pause,
         )
-        if n_runs is None:
-            cont = input("(q) to quit playing: ")
+        cont = input("(q) to quit playing: ")
 
         n_games += 1
 
@@ -72,12 +104,116 @@ def play_game(
         print(f"games: {n_games} | wins 1: {n_wins1} | wins 2: {n_wins2} "
               f"| ties: {n_ties}")
 
-        if n_runs and (n_games >= n_runs):
-            break
+    return n_games, n_wins1, n_wins2, n_ties
+
 
+def _tally(results: List[int]) -> Tuple[int, int, int, int]:
+    # one C-level pass over the winners instead of a python branch
+    # chain per game; winners are -1 (tie), 1 or 2
+    if np is not None:
+        counts = np.bincount(np.asarray(results) + 1, minlength=4)
+        n_ties, n_wins1, n_wins2 = int(counts[0]), int(counts[2]), int(counts[3])
+    else:
+        n_ties = results.count(-1)
+        n_wins1 = results.count(1)
+        n_wins2 = results.count(2)
+
+    n_games = len(results)
+    if n_games != n_ties + n_wins1 + n_wins2:
+        raise ValueError
+
+    print(f"games: {n_games} | wins 1: {n_wins1} | wins 2: {n_wins2} "
+          f"| ties: {n_ties}")
     return n_games, n_wins1, n_wins2, n_ties
 
 
+# agents hold a reference to the engine module, which cannot be
+# pickled; for parallel runs they are described by a small spec tuple
+# and rebuilt inside the worker process
+_AgentSpec = Tuple[Any, ...]
+
+
+def _agent_to_spec(agent: Agents) -> _AgentSpec:
+    if isinstance(agent, RandomAgent):
+        return ('random', agent.player.i)
+    if isinstance(agent, MctsAgent):
+        return (
+            'mcts', agent.player.i, agent.n_iter, agent.allow_concession,
+            agent.n_leaf, agent.reuse_cache)
+    raise ValueError(f"Cannot run {agent} in parallel")
+
+
+def _spec_to_agent(spec: _AgentSpec, engine: Engine) -> Agents:
+    if spec[0] == 'random':
+        return RandomAgent(player=engine.init_player(spec[1]), engine=engine)
+    if spec[0] == 'mcts':
+        return MctsAgent(
+            player=engine.init_player(spec[1]),
+            engine=engine,
+            n_iter=spec[2],
+            allow_concession=spec[3],
+            n_leaf=spec[4],
+            # the cache then persists across the moves of one game;
+            # workers cannot share it across games
+            reuse_cache=spec[5],
+        )
+    raise ValueError(f"Unknown agent spec {spec}")
+
+
+def _init_worker() -> None:
+    # forked workers inherit the parent's generator states (the main
+    # thread keeps its thread-local mcts generator across the fork);
+    # unlike the stdlib random module they are not reseeded after
+    # fork, so without this every worker replays the same games
+    # pylint: disable=protected-access
+    mcts._get_rng().reseed()
+    nim._seed_rng.reseed()
+
+
+def _play_game_worker(
+        game: str,
+        spec1: _AgentSpec,
+        spec2: _AgentSpec,
+        board: Optional[Board],
+) -> int:
+    engine = ENGINES[game]
+    winner = _play_game(
+        agent1=_spec_to_agent(spec1, engine),
+        agent2=_spec_to_agent(spec2, engine),
+        engine=engine,
+        board=board,
+        silent=True,
+    )
+    return int(winner)
+
+
+def _play_games_parallel(
+        agent1: Agents,
+        agent2: Agents,
+        engine: Engine,
+        board: Optional[Board],
+        n_runs: int,
+        n_jobs: int,
+) -> Tuple[int, int, int, int]:
+    # root parallelization: the games are independent, so they scale
+    # with the number of cores
+    if n_jobs <= 0:
+        n_jobs = os.cpu_count() or 1
+
+    game = next(name for name, eng in ENGINES.items() if eng is engine)
+    spec1, spec2 = _agent_to_spec(agent1), _agent_to_spec(agent2)
+
+    with futures.ProcessPoolExecutor(
+            max_workers=n_jobs, initializer=_init_worker) as executor:
+        tasks = [
+            executor.submit(_play_game_worker, game, spec1, spec2, board)
+            for _ in range(n_runs)
+        ]
+        results = [task.result() for task in futures.as_completed(tasks)]
+
+    return _tally(results)
+
+
 def _void(*args: Any, **kwargs: Any) -> None:  # pylint: disable=unused-argument
     pass
 
@@ -96,7 +232,10 @@ def _play_game(
     waited = 0.0
     conceded = False
 
-    while not game.winner:
+    # evaluate the winner once per turn; for engines that compute it
+    # lazily this halves the property dispatch per loop
+    winner = game.winner
+    while not winner:
         if game.player == agent1.player:
             agent = agent1
         elif game.player == agent2.player:
@@ -118,6 +257,7 @@ def _play_game(
             conceded = True
             break
 
+        winner = game.winner
         waited = time.time() - tic
         gc.collect()
 
@@ -127,11 +267,11 @@ def _play_game(
         sink(f"Winner: {winner_agent}")
         return winner_agent.player
 
-    if game.winner == -1:
+    if winner == -1:
         sink("Game was tied")
-        return game.winner
+        return winner
 
-    winner_agent = agent1 if game.winner == 1 else agent2
+    winner_agent = agent1 if winner == 1 else agent2
     sink(f"Winner: {winner_agent}")
     return winner_agent.player
 
@@ -208,6 +348,10 @@ def run(
               help="number of simulations")
 @click.option('--silent', default=True, type=click.BOOL,
               help="show intermediate results")
+@click.option('--n_jobs', default=1, type=click.INT,
+              help="number of parallel processes, <= 0 uses all cores")
+@click.option('--leaf_parallel', default=1, type=click.INT,
+              help="number of rollouts per mcts expansion")
 def simulate(  # pylint: disable=too-many-arguments,too-many-locals
         game: str,
         agent1: str,
@@ -218,6 +362,8 @@ def simulate(  # pylint: disable=too-many-arguments,too-many-locals
         learning1: bool = False,
         learning2: bool = False,
         silent: bool = True,
+        n_jobs: int = 1,
+        leaf_parallel: int = 1,
 ) -> Tuple[int, int, int, int]:
     engine = ENGINES[game]
 
@@ -230,6 +376,7 @@ def simulate(  # pylint: disable=too-many-arguments,too-many-locals
             engine=engine,
             n_iter=n_iter1,
             reuse_cache=learning1,
+            n_leaf=leaf_parallel,
         )
     else:
         raise ValueError
@@ -243,12 +390,14 @@ def simulate(  # pylint: disable=too-many-arguments,too-many-locals
             engine=engine,
             n_iter=n_iter2,
             reuse_cache=learning2,
+            n_leaf=leaf_parallel,
         )
     else:
         raise ValueError
 
     n_games, n_wins1, n_wins2, n_ties = play_game(
-        agent1_, agent2_, engine=engine, n_runs=n_runs, silent=silent)
+        agent1_, agent2_, engine=engine, n_runs=n_runs, silent=silent,
+        n_jobs=n_jobs)
     return n_games, n_wins1, n_wins2, n_ties
 
 
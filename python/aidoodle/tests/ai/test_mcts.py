@@ -252,6 +252,15 @@ class TestAgentNim:
         expected = engine.Move(2, 1)
         assert move == expected
 
+    def test_mcts_agrees_with_oracle(self, engine, agent):
+        # after the agent's move the opponent should be left without a
+        # winning move, as judged by the perfect play oracle
+        for state in [(0, 2, 0), (1, 1, 4), (2, 3, 0)]:
+            game = engine.init_game(board=engine.Board(state=state))
+            move = agent.next_move(game)
+            board = engine.apply_move(board=game.board, move=move)
+            assert engine.perfect_move(board) is None
+
     @pytest.mark.slow
     @pytest.mark.parametrize('agent1, agent2', [
         ('random', 'mcts'),
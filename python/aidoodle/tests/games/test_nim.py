@@ -1,6 +1,8 @@
 # type: ignore
 
 
+import random
+
 import pytest
 
 
@@ -86,6 +88,134 @@ class TestLegalMoves:
         assert moves == expected
 
 
+class TestBoardInit:
+    def test_packed_int_roundtrip(self, board_cls):
+        packed = board_cls((3, 4, 5)).packed
+        assert board_cls(packed).state == (3, 4, 5)
+
+    @pytest.mark.parametrize('packed', [-1, 1 << 12, 1 << 30])
+    def test_packed_int_out_of_range(self, packed, board_cls):
+        # stray bits would make a non-empty board without stones, on
+        # which the rollout backends divide by zero
+        with pytest.raises(ValueError):
+            board_cls(packed)
+
+
+class TestBoardHash:
+    def test_transpositions_hash_equal(self, nim, board_cls, move_cls):
+        # the same position reached via different move orders must
+        # compare and hash equal, so the tree search can merge them
+        board1 = nim.apply_move(board=board_cls((3, 4, 5)), move=move_cls(0, 1))
+        board1 = nim.apply_move(board=board1, move=move_cls(1, 2))
+        board2 = nim.apply_move(board=board_cls((3, 4, 5)), move=move_cls(1, 2))
+        board2 = nim.apply_move(board=board2, move=move_cls(0, 1))
+        assert board1 == board2
+        assert hash(board1) == hash(board2)
+
+    def test_different_boards_hash_differently(self, board_cls):
+        boards = [
+            board_cls((i, j, k))
+            for i in range(3) for j in range(3) for k in range(3)
+        ]
+        assert len({hash(board) for board in boards}) == len(boards)
+
+
+class TestPerfectMove:
+    @pytest.fixture
+    def perfect_move(self, nim):
+        return nim.perfect_move
+
+    @pytest.mark.parametrize('state, expected', [
+        ((0, 2, 0), (1, 1)),  # leave the last stone to the opponent
+        ((0, 7, 0), (1, 6)),
+        ((1, 1, 4), (2, 3)),  # leave three single-stone heaps
+        ((1, 1, 2), (2, 1)),
+        ((2, 1, 0), (0, 2)),  # leave a single stone
+        ((1, 1, 0), (0, 1)),  # take one, opponent takes the last
+        ((1, 0, 0), None),    # losing, no winning move
+        ((1, 1, 1), None),
+        ((2, 2, 0), None),
+        ((1, 2, 3), None),
+    ])
+    def test_perfect_move(self, state, expected, board_cls, perfect_move):
+        move = perfect_move(board_cls(state))
+        if expected is None:
+            assert move is None
+        else:
+            assert tuple(move) == expected
+
+    def test_winning_move_leaves_lost_position(
+            self, nim, board_cls, perfect_move,
+    ):
+        # whenever a winning move exists, the opponent must be left
+        # without one
+        for h0 in range(5):
+            for h1 in range(5):
+                for h2 in range(5):
+                    board = board_cls((h0, h1, h2))
+                    move = perfect_move(board)
+                    if move is None:
+                        continue
+                    assert perfect_move(nim.apply_move(board=board, move=move)) is None
+
+
+class TestRollout:
+    @pytest.fixture
+    def rollout(self, nim):
+        return nim.rollout
+
+    def test_forced_loss(self, board_cls, rollout, init_game):
+        # the player to move must take the last stone and thus loses
+        game = init_game(board=board_cls((0, 1, 0)), player_idx=0)
+        assert rollout(game) == 0.0
+
+    def test_forced_win(self, board_cls, rollout, init_game):
+        # the other player must take the last stone, player 1 wins
+        game = init_game(board=board_cls((1, 0, 0)), player_idx=1)
+        assert rollout(game) == 1.0
+
+    def test_scores_are_valid(self, board_cls, rollout, init_game):
+        game = init_game(board=board_cls((3, 4, 5)))
+        scores = {rollout(game) for _ in range(100)}
+        assert scores <= {0.0, 1.0}
+
+
+class TestRolloutBackends:
+    def test_c_extension_matches_plain_python(self, nim, board_cls):
+        # the c extension mirrors _rollout_plain, so for the same
+        # (state, player_idx, seed) both must pick the same winner
+        nim_fast = pytest.importorskip('aidoodle._nim_fast')
+        rng = random.Random(0)
+        for _ in range(200):
+            board = board_cls(
+                (rng.randint(0, 9), rng.randint(0, 9), rng.randint(0, 9)))
+            player_idx = rng.randint(0, 1)
+            seed = rng.getrandbits(62) | 1
+            assert nim_fast.rollout(board.packed, player_idx, seed) \
+                == nim._rollout_plain(board.packed, player_idx, seed)
+
+
+class TestRolloutMany:
+    @pytest.fixture
+    def rollout_many(self, nim):
+        return nim.rollout_many
+
+    def test_forced_loss(self, board_cls, rollout_many, init_game):
+        game = init_game(board=board_cls((0, 1, 0)), player_idx=0)
+        assert rollout_many(game, 10) == 0.0
+
+    def test_forced_win(self, board_cls, rollout_many, init_game):
+        game = init_game(board=board_cls((1, 0, 0)), player_idx=1)
+        assert rollout_many(game, 10) == 1.0
+
+    def test_matches_single_rollouts(self, nim, board_cls, init_game):
+        # the batched average should agree with many single rollouts
+        game = init_game(board=board_cls((3, 4, 5)))
+        batched = nim.rollout_many(game, 2000)
+        single = sum(nim.rollout(game) for _ in range(2000)) / 2000
+        assert abs(batched - single) < 0.1
+
+
 class TestApplyMoves:
     @pytest.fixture
     def apply_move(self, nim):
@@ -0,0 +1,29 @@
+# type: ignore
+
+
+import pytest
+
+
+@pytest.fixture
+def rng_cls():
+    # pylint: disable=import-outside-toplevel
+    from aidoodle.rng import XorShift64
+    return XorShift64
+
+
+class TestXorShift64:
+    def test_deterministic_given_seed(self, rng_cls):
+        draws1 = [rng_cls(seed=123).next_int() for _ in range(10)]
+        draws2 = [rng_cls(seed=123).next_int() for _ in range(10)]
+        assert draws1 == draws2
+
+    def test_choice_returns_elements(self, rng_cls):
+        rng = rng_cls()
+        seq = ['a', 'b', 'c']
+        assert all(rng.choice(seq) in seq for _ in range(100))
+
+    def test_choice_covers_sequence(self, rng_cls):
+        rng = rng_cls()
+        seq = list(range(5))
+        picked = {rng.choice(seq) for _ in range(200)}
+        assert picked == set(seq)
@@ -1,6 +1,6 @@
 import os
 
-from setuptools import setup, find_packages
+from setuptools import Extension, setup, find_packages
 
 
 with open('VERSION', 'r') as f:
@@ -19,6 +19,16 @@ docs_require = []
 README = ''
 CHANGES = ''
 
+# optional: the package works without the compiled rollout, it is
+# just slower (see aidoodle/games/nim.py)
+ext_modules = [
+    Extension(
+        'aidoodle._nim_fast',
+        sources=['aidoodle/_nim_fast.c'],
+        optional=True,
+    ),
+]
+
 setup(
     name='aidoodle',
     version=version,
@@ -29,6 +39,7 @@ setup(
     include_package_data=True,
     url="https://github.com/BenjaminBossan/aidoodle",
     zip_safe=False,
+    ext_modules=ext_modules,
     install_requires=install_requires,
     extras_require={
         'testing': tests_require,